@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+ * TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-蓝鲸 PaaS 平台(BlueKing-PaaS) available.
+ * Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+ * Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at http://opensource.org/licenses/MIT
+ * Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+ * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+ * specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import os
+import ssl
+from datetime import timedelta
+from functools import lru_cache
+from timeit import default_timer
+from typing import Any, Dict, Optional, Tuple, Union  # noqa
+
+import aiohttp
+from requests import PreparedRequest, Request, Response  # noqa
+from requests.exceptions import ConnectionError, RequestException, Timeout
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from yarl import URL
+
+from bkapi_client_core.base import Operation  # noqa
+from bkapi_client_core.client import BaseClient
+from bkapi_client_core.config import HookEvent
+
+
+def _build_timeout(timeout):
+    # type: (Any) -> aiohttp.ClientTimeout
+    """Convert the requests style timeout to aiohttp ClientTimeout"""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+@lru_cache(maxsize=32)
+def _get_ssl_context(
+    verify,  # type: Union[bool, str]
+    cert,  # type: Union[None, str, Tuple[str, str]]
+):
+    # type: (...) -> Union[bool, ssl.SSLContext]
+    """Convert the requests style verify and cert to aiohttp ssl, the contexts are cached to avoid loading the files"""
+    if not cert and isinstance(verify, bool):
+        # aiohttp verifies the certificates by default
+        return verify
+
+    if verify is True or verify is False:
+        context = ssl.create_default_context()
+    elif os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    else:
+        context = ssl.create_default_context(cafile=verify)
+
+    if verify is False:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    if isinstance(cert, tuple):
+        context.load_cert_chain(*cert)
+    elif cert:
+        context.load_cert_chain(cert)
+
+    return context
+
+
+def _build_response(
+    request,  # type: PreparedRequest
+    resp,  # type: aiohttp.ClientResponse
+    content,  # type: bytes
+    elapsed,  # type: float
+):
+    # type: (...) -> Response
+    """Convert the aiohttp response to requests Response, so that it can be parsed as the sync one"""
+    response = Response()
+    response.status_code = resp.status
+    response.reason = resp.reason
+    response.headers = CaseInsensitiveDict(resp.headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = str(resp.url)
+    response.request = request
+    response.elapsed = timedelta(seconds=elapsed)
+    response._content = content
+
+    return response
+
+
+class AsyncBaseClient(BaseClient):
+    """
+    AsyncBaseClient sends requests by aiohttp, so that multiple operations can be awaited concurrently.
+
+    Requests are still prepared by the Session, so headers, authorization and hooks work the same as BaseClient,
+    and the responses are converted to requests Response, which can be parsed by `parse_response`.
+
+    The aiohttp session is kept until `aclose` is called, `close_after_request` does not apply to it,
+    since it is shared by the concurrent requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._aiohttp_session = None  # type: Optional[aiohttp.ClientSession]
+        self._aiohttp_loop = None  # type: Optional[asyncio.AbstractEventLoop]
+        super(AsyncBaseClient, self).__init__(*args, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def ahandle_request(
+        self,
+        operation,  # type: Operation
+        context,  # type: Dict[str, Any]
+    ):
+        # type: (...) -> Optional[Response]
+        """Handle operation with context asynchronously"""
+
+        # you can inject extra context from hooks
+        if self.session.has_hooks(HookEvent.OPERATION_PREPARED):
+            context = self.session.dispatch_hook(HookEvent.OPERATION_PREPARED, context, operation=operation)
+
+        try:
+            request_context = self._get_request_context(operation, context)
+            cache_key = self._get_response_cache_key(request_context)
+            response = self._get_cached_response(cache_key, request_context)
+            if response is None:
+                response = await self._asend(**request_context)
+                if cache_key is not None:
+                    self._cache_response(cache_key, response)
+
+            return self._handle_response(operation, context, response)
+        except RequestException as err:
+            self.session.dispatch_hook(HookEvent.OPERATION_ERROR, err, operation=operation)
+            return self._handle_exception(operation, context, err)
+
+    async def arequest(
+        self,
+        operation,  # type: Operation
+        data=None,  # type: Optional[Any]
+        **kwargs,  # type: Any
+    ):
+        # type: (...) -> Optional[Response]
+        """Request to the api asynchronously and return the Response directly, like `Operation.request`"""
+        return await self.ahandle_request(operation, operation._get_context(data=data, **kwargs))
+
+    async def acall(
+        self,
+        operation,  # type: Operation
+        data=None,  # type: Optional[Any]
+        **kwargs,  # type: Any
+    ):
+        # type: (...) -> Any
+        """Request to the api asynchronously and return the parsed result, like `Operation.__call__`"""
+        response = await self.arequest(operation, data, **kwargs)
+        return self.parse_response(operation, response)
+
+    async def aclose(self):
+        """Close the aiohttp session and the session"""
+        try:
+            await self._close_aiohttp_session()
+        finally:
+            self.close()
+
+    async def _close_aiohttp_session(self):
+        if self._aiohttp_session is None:
+            return
+
+        # the session can only be closed in its own loop, or after the loop is closed,
+        # in which case the connections have been dropped with the loop and closing it only releases the session
+        if self._aiohttp_loop is not asyncio.get_running_loop() and not self._aiohttp_loop.is_closed():  # type: ignore
+            raise RuntimeError("the aiohttp session is used by another running event loop, call `aclose` in it")
+
+        session = self._aiohttp_session
+        self._aiohttp_session = None
+        self._aiohttp_loop = None
+        await session.close()
+
+    async def _get_aiohttp_session(self):
+        # type: (...) -> aiohttp.ClientSession
+        # the aiohttp session is bound to the running event loop when it is created, so create it lazily,
+        # and replace it when the client is used in a new loop, such as the successive `asyncio.run`
+        loop = asyncio.get_running_loop()
+        if self._aiohttp_loop is not loop:
+            await self._close_aiohttp_session()
+
+        if self._aiohttp_session is None or self._aiohttp_session.closed:
+            self._aiohttp_session = aiohttp.ClientSession()
+            self._aiohttp_loop = loop
+
+        return self._aiohttp_session
+
+    async def _asend(
+        self,
+        url,  # type: str
+        method,  # type: str
+        *,
+        path_params=None,  # type: Optional[Dict[str, Any]]
+        timeout=None,  # type: Any
+        proxies=None,  # type: Optional[Dict[str, str]]
+        verify=None,  # type: Any
+        allow_redirects=True,  # type: bool
+        cert=None,  # type: Union[None, str, Tuple[str, str]]
+        stream=None,  # type: Optional[bool]
+        **kwargs,  # type: Any
+    ):
+        # type: (...) -> Response
+        # the arguments of Session.request, which are not accepted by Request, are handled here,
+        # `stream` is ignored, since the content is always read before the aiohttp response is released
+        request = Request(method=method.upper(), url=self.session.render_url(url, path_params), **kwargs)
+        prepared = self.session.prepare_request(request)
+
+        request_kwargs = {
+            "headers": prepared.headers,
+            "data": prepared.body,
+            "allow_redirects": allow_redirects,
+            "timeout": _build_timeout(timeout or self.session.timeout),
+            "proxy": select_proxy(prepared.url, proxies or self.session.proxies),
+        }  # type: Dict[str, Any]
+
+        ssl_context = _get_ssl_context(self.session.verify if verify is None else verify, cert or self.session.cert)
+        if ssl_context is not True:
+            request_kwargs["ssl"] = ssl_context
+
+        started_at = default_timer()
+        try:
+            # the url has been encoded by requests, avoid encoding it again
+            session = await self._get_aiohttp_session()
+            async with session.request(
+                prepared.method, URL(prepared.url, encoded=True), **request_kwargs
+            ) as resp:
+                content = await resp.read()
+        except asyncio.TimeoutError as err:
+            raise Timeout(err, request=prepared)
+        except aiohttp.ClientConnectionError as err:
+            raise ConnectionError(err, request=prepared)
+        except aiohttp.ClientError as err:
+            raise RequestException(err, request=prepared)
+
+        response = _build_response(prepared, resp, content, default_timer() - started_at)
+        return dispatch_hook(HookEvent.RESPONSE, prepared.hooks, response)
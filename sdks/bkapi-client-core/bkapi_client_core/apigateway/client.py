@@ -8,6 +8,7 @@
  * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
  * specific language governing permissions and limitations under the License.
 """
+from functools import lru_cache
 from typing import Optional  # noqa
 
 from bkapi_client_core.client import BaseClient
@@ -16,6 +17,13 @@ from bkapi_client_core.session import Session  # noqa
 from bkapi_client_core.utils import urljoin
 
 
+@lru_cache(maxsize=1024)
+def _render_endpoint(endpoint, gateway_name, stage_name):
+    # type: (str, str, str) -> str
+    # the endpoint is rendered for each request, but the variables are fixed for a client
+    return endpoint.format(gateway_name=gateway_name, api_name=gateway_name, stage_name=stage_name)
+
+
 class APIGatewayClient(BaseClient):
     _default_stage = "prod"
     _gateway_name = ""
@@ -53,7 +61,7 @@ class APIGatewayClient(BaseClient):
         # render the endpoint first.
         gateway_name = self._get_gateway_name()
         # 兼容 endpoint 中包含 gateway_name，api_name
-        return self._endpoint.format(gateway_name=gateway_name, api_name=gateway_name, stage_name=self._stage)
+        return _render_endpoint(self._endpoint, gateway_name, self._stage)
 
     def _get_gateway_name(self):
         # type: (...) -> str
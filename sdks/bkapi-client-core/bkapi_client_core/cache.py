@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+ * TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-蓝鲸 PaaS 平台(BlueKing-PaaS) available.
+ * Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+ * Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at http://opensource.org/licenses/MIT
+ * Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+ * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+ * specific language governing permissions and limitations under the License.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import mktime_tz, parsedate_tz
+from typing import Any, Mapping, Optional, Tuple  # noqa
+
+from requests import Response  # noqa
+
+_MAX_AGE_PATTERN = re.compile(r"(?:^|[\s,])max-age=\"?(\d+)")
+_NO_CACHE_DIRECTIVES = ("no-store", "no-cache")
+
+
+def get_cache_ttl(headers):
+    # type: (Optional[Mapping[str, str]]) -> Optional[float]
+    """Get the seconds the response can be cached, from the Cache-Control or Expires header"""
+    if not headers:
+        return None
+
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if any(directive in cache_control for directive in _NO_CACHE_DIRECTIVES):
+        return None
+
+    # max-age has higher priority than Expires
+    matched = _MAX_AGE_PATTERN.search(cache_control)
+    if matched:
+        return float(matched.group(1))
+
+    expires = headers.get("Expires")
+    if not expires:
+        return None
+
+    parsed = parsedate_tz(expires)
+    if not parsed:
+        return None
+
+    return mktime_tz(parsed) - time.time()
+
+
+class ResponseCache(object):
+    """
+    ResponseCache is a thread-safe LRU cache of responses, the entries expire as the response headers declared.
+
+    The parsed content of a cached response is kept on the response, so it is not parsed again on the next hits,
+    the content is shared between callers and should not be modified.
+    """
+
+    def __init__(
+        self,
+        maxsize=1024,  # type: int
+    ):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # type: OrderedDict[Any, Tuple[Response, float]]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(
+        self,
+        key,  # type: Any
+    ):
+        # type: (...) -> Optional[Response]
+        """Return the cached response, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            response, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return response
+
+    def set(
+        self,
+        key,  # type: Any
+        response,  # type: Response
+    ):
+        # type: (...) -> bool
+        """Cache the response if the headers allow it, return whether it is cached"""
+        ttl = get_cache_ttl(response.headers)
+        if not ttl or ttl <= 0:
+            return False
+
+        response._bkapi_cached = True  # type: ignore
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return True
+
+    def clear(self):
+        """Remove all the cached responses"""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def has_content(response):
+        # type: (Response) -> bool
+        """Whether the parsed content of the cached response is kept"""
+        return "_bkapi_content" in getattr(response, "__dict__", ())
+
+    @staticmethod
+    def get_content(response):
+        # type: (Response) -> Any
+        return response._bkapi_content  # type: ignore
+
+    @staticmethod
+    def set_content(
+        response,  # type: Response
+        content,  # type: Any
+    ):
+        """Keep the parsed content on the response, only if it is cached"""
+        if getattr(response, "__dict__", {}).get("_bkapi_cached"):
+            response._bkapi_content = content  # type: ignore
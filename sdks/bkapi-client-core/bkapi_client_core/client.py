@@ -10,15 +10,18 @@
 """
 import json
 import logging
-from typing import Any, Dict, Optional  # noqa
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Tuple  # noqa
 
 from requests import Response  # noqa
 from requests.exceptions import HTTPError, RequestException
-from requests.sessions import merge_setting
+from requests.hooks import dispatch_hook
+from requests.sessions import merge_hooks, merge_setting
 from requests.structures import CaseInsensitiveDict
 
 from bkapi_client_core.auth import BKApiAuthorization
 from bkapi_client_core.base import Operation  # noqa
+from bkapi_client_core.cache import ResponseCache
 from bkapi_client_core.config import HookEvent
 from bkapi_client_core.exceptions import (
     APIGatewayResponseError,
@@ -27,13 +30,50 @@ from bkapi_client_core.exceptions import (
     JSONResponseError,
     ResponseError,
 )
-from bkapi_client_core.session import Session
+from bkapi_client_core.session import Session, ensure_pool_maxsize
 from bkapi_client_core.utils import CurlRequest, urljoin
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future  # noqa
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# where the data of requests is placed, by method, the data of other methods will be sent as the json body
+_DATA_PLACEMENT = {"GET": "params", "HEAD": "params", "OPTIONS": "params"}
+_CACHEABLE_METHODS = frozenset(["GET", "HEAD"])
+
+
+def _parse_json(
+    response,  # type: Response
+):
+    # type: (...) -> Any
+    """Parse the response content as json, orjson is preferred if installed, which is much faster"""
+    if orjson is not None:
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            # orjson only accepts utf-8 content, let requests detect the encoding
+            pass
+
+    return response.json()
+
+
+@lru_cache(maxsize=2048)
+def _cached_urljoin(endpoint, path):
+    # type: (str, str) -> str
+    # the path is the template of operation which is rendered by the session later,
+    # so the combinations of endpoint and path are limited
+    return urljoin(endpoint, path)
+
 
 class RequestContextBuilder(object):
+    __slots__ = ()
+
     def build(
         self,
         endpoint,  # type: str
@@ -61,7 +101,7 @@ class RequestContextBuilder(object):
         endpoint,  # type: str
         path,  # type: str
     ):
-        context["url"] = urljoin(endpoint, path)
+        context["url"] = _cached_urljoin(endpoint, path)
 
     def build_data(
         self,
@@ -71,10 +111,10 @@ class RequestContextBuilder(object):
         if not data:
             return
 
-        if context["method"] in ["GET", "HEAD", "OPTIONS"]:
-            params = data.copy()
-            params.update(context.get("params") or {})
-            context["params"] = params
+        if _DATA_PLACEMENT.get(context["method"], "json") == "params":
+            params = context.get("params")
+            # the data is not modified, so it is safe to use it directly
+            context["params"] = {**data, **params} if params else data
         else:
             context["json"] = data
 
@@ -82,27 +122,34 @@ class RequestContextBuilder(object):
 class ResponseHeadersRepresenter(object):
     """Provide useful methods for response headers"""
 
+    __slots__ = ("_headers", "error_code", "error_message", "request_id")
+
+    # the lowercase keys, which are used by the store of CaseInsensitiveDict
+    _error_code_key = "x-bkapi-error-code"
+    _error_message_key = "x-bkapi-error-message"
+    _request_id_key = "x-bkapi-request-id"
+
     def __init__(self, headers):
         self._headers = headers
 
+        # read the headers only once, they are used in logs and exceptions repeatedly
+        if isinstance(headers, CaseInsensitiveDict):
+            # the store maps lowercase keys to (key, value), lookup it directly to avoid lowering the keys
+            store = headers._store
+            self.error_code = store[self._error_code_key][1] if self._error_code_key in store else ""
+            self.error_message = store[self._error_message_key][1] if self._error_message_key in store else ""
+            self.request_id = store[self._request_id_key][1] if self._request_id_key in store else ""
+        else:
+            self.error_code = self._get_header("X-Bkapi-Error-Code", "")
+            self.error_message = self._get_header("X-Bkapi-Error-Message", "")
+            self.request_id = self._get_header("X-Bkapi-Request-Id", "")
+
     def _get_header(self, key, default=""):
         if not self._headers:
             return default
 
         return self._headers.get(key, default)
 
-    @property
-    def error_code(self):
-        return self._get_header("X-Bkapi-Error-Code", "")
-
-    @property
-    def error_message(self):
-        return self._get_header("X-Bkapi-Error-Message", "")
-
-    @property
-    def request_id(self):
-        return self._get_header("X-Bkapi-Request-Id", "")
-
     @property
     def has_apigateway_error(self):
         # type: (...) -> bool
@@ -113,20 +160,24 @@ class ResponseHeadersRepresenter(object):
         if not self._headers:
             return ""
 
-        parts = ["request_id: %s" % self.request_id]
+        text = f"request_id: {self.request_id}"
 
         if self.error_code:
-            parts.append("error_code: %s" % self.error_code)
+            text = f"{text}, error_code: {self.error_code}"
 
         if self.error_message:
-            parts.append(self.error_message)
+            text = f"{text}, {self.error_message}"
 
-        return ", ".join(parts)
+        return text
 
 
 class BaseClient(object):
     _build_class = RequestContextBuilder
-    _reuse_session_connection = False
+    _reuse_session_connection = True
+    # the pooled connections are kept alive between requests by default, and shared by the clients in the process,
+    # set it to True to use a pool owned by the client and close it after each request, unless in the `with` block
+    close_after_request = False
+    _response_cache = None  # type: Optional[ResponseCache]
     name = "client"
 
     def __init__(
@@ -136,8 +187,9 @@ class BaseClient(object):
         name=None,  # type: Optional[str]
     ):
         self._endpoint = endpoint
-        self.session = session or Session()
+        self.session = session or Session(share_connection_pool=not self.close_after_request)
         self._context_builder = self._build_class()
+        self._reuse_session_connection = not self.close_after_request
 
         if name:
             self.name = name
@@ -152,7 +204,7 @@ class BaseClient(object):
         return self
 
     def __exit__(self, *args):
-        self._reuse_session_connection = False
+        self._reuse_session_connection = not self.close_after_request
         self.close()
 
     def __str__(self):
@@ -168,18 +220,77 @@ class BaseClient(object):
     ):
         # type: (...) -> Optional[Response]
         """Handle operation with context"""
+        return self._handle_request(operation, context, self._reuse_session_connection)
+
+    def _handle_request(
+        self,
+        operation,  # type: Operation
+        context,  # type: Dict[str, Any]
+        reuse_session_connection,  # type: bool
+    ):
+        # type: (...) -> Optional[Response]
 
         # you can inject extra context from hooks
-        context = self.session.dispatch_hook(HookEvent.OPERATION_PREPARED, context, operation=operation)
+        if self.session.has_hooks(HookEvent.OPERATION_PREPARED):
+            context = self.session.dispatch_hook(HookEvent.OPERATION_PREPARED, context, operation=operation)
+
         try:
-            response = self.session.handle(**self._get_request_context(operation, context))
-            return self._handle_response(operation, context, response)
+            request_context = self._get_request_context(operation, context)
+            cache_key = self._get_response_cache_key(request_context)
+            response = self._get_cached_response(cache_key, request_context)
+            if response is None:
+                response = self.session.handle(**request_context)
+                if cache_key is not None:
+                    self._cache_response(cache_key, response)
         except RequestException as err:
             self.session.dispatch_hook(HookEvent.OPERATION_ERROR, err, operation=operation)
+            if not reuse_session_connection:
+                self.close()
+            # the exception will be raised again
             return self._handle_exception(operation, context, err)
+
+        if not reuse_session_connection:
+            # close the pooled connections to avoid connection leaks
+            self.close()
+
+        return self._handle_response(operation, context, response)
+
+    def handle_request_many(
+        self,
+        operations_and_contexts,  # type: Iterable[Tuple[Operation, Dict[str, Any]]]
+        max_workers=25,  # type: int
+    ):
+        # type: (...) -> Iterator[Tuple[Operation, Dict[str, Any], Future]]
+        """
+        Handle operations with contexts concurrently in threads, the pooled connections are shared between them.
+
+        Yield the operation, context and the future of `handle_request` as each request completes,
+        the result of the future is the response, which can be parsed by `parse_response`.
+
+        It is a generator, nothing is sent until the caller starts iterating it.
+        The requests in batch do not close the session, it is closed after the batch if `close_after_request` is set.
+
+        :param operations_and_contexts: pairs of operation and context
+        :param max_workers: the max number of threads, the connection pool will be enlarged if it is less than it
+        """
+        # only required by the batch mode, import it lazily to reduce the import time
+        from concurrent.futures import ThreadPoolExecutor, as_completed  # noqa: PLC0415
+
+        ensure_pool_maxsize(self.session, max_workers)
+
+        reuse_session_connection = self._reuse_session_connection
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self._handle_request, operation, context, True): (operation, context)
+                    for operation, context in operations_and_contexts
+                }
+
+                for future in as_completed(futures):
+                    operation, context = futures[future]
+                    yield operation, context, future
         finally:
-            if not self._reuse_session_connection:
-                # close the pooled connections to avoid connection leaks
+            if not reuse_session_connection:
                 self.close()
 
     def parse_response(
@@ -202,13 +313,16 @@ class BaseClient(object):
         if response is None:
             return
 
-        response_headers_representer = ResponseHeadersRepresenter(response.headers)
-        if response_headers_representer.has_apigateway_error:
-            raise APIGatewayResponseError(
-                "Error responded by API Gateway",
-                response=response,
-                response_headers_representer=response_headers_representer,
-            )
+        # the error is rare, check the header directly and build the representer only when necessary
+        headers = response.headers
+        if not headers or not headers.get("X-Bkapi-Error-Code"):
+            return
+
+        raise APIGatewayResponseError(
+            "Error responded by API Gateway",
+            response=response,
+            response_headers_representer=ResponseHeadersRepresenter(headers),
+        )
 
     def update_headers(
         self,
@@ -221,7 +335,20 @@ class BaseClient(object):
         :param headers: HTTP headers
         :type headers: Dict[str, str]
         """
-        self.session.headers = merge_setting(headers, self.session.headers, dict_class=CaseInsensitiveDict)
+        if not headers:
+            return
+
+        session_headers = self.session.headers
+        if not isinstance(session_headers, CaseInsensitiveDict):
+            self.session.headers = merge_setting(headers, session_headers, dict_class=CaseInsensitiveDict)
+            return
+
+        # update in place, the header with value None will be removed, which is the same as merge_setting
+        for key, value in headers.items():
+            if value is None:
+                session_headers.pop(key, None)
+            else:
+                session_headers[key] = value
 
     def update_bkapi_authorization(self, **auth):
         """
@@ -255,6 +382,24 @@ class BaseClient(object):
         """
         self.session.verify = False
 
+    def enable_response_cache(
+        self,
+        maxsize=1024,  # type: int
+    ):
+        """
+        Cache the successful responses of GET/HEAD requests, as the Cache-Control or Expires headers declared
+
+        :param maxsize: the max number of cached responses
+        :type maxsize: int
+        """
+        self._response_cache = ResponseCache(maxsize)
+
+    def disable_response_cache(self):
+        """
+        Disable the response cache, and drop the cached responses
+        """
+        self._response_cache = None
+
     def _get_endpoint(self):
         # type: (...) -> str
         return self._endpoint
@@ -274,6 +419,58 @@ class BaseClient(object):
 
         return request_context
 
+    def _get_response_cache_key(
+        self,
+        request_context,  # type: Dict[str, Any]
+    ):
+        # type: (...) -> Optional[str]
+        if self._response_cache is None or request_context.get("method") not in _CACHEABLE_METHODS:
+            return None
+
+        auth = self.session.auth
+        try:
+            return json.dumps(
+                [
+                    # hooks are functions which are created for each request, ignore them
+                    {k: v for k, v in request_context.items() if k != "hooks"},
+                    self.session.path_params,
+                    dict(self.session.headers),
+                    auth.auth if isinstance(auth, BKApiAuthorization) else repr(auth),
+                ],
+                sort_keys=True,
+                default=repr,
+            )
+        except TypeError:
+            # the keys of different types can not be sorted, such as the params {1: "a", "b": 2}, skip caching
+            return None
+
+    def _get_cached_response(
+        self,
+        cache_key,  # type: Optional[str]
+        request_context,  # type: Dict[str, Any]
+    ):
+        # type: (...) -> Optional[Response]
+        if cache_key is None:
+            return None
+
+        response = self._response_cache.get(cache_key)  # type: ignore
+        if response is None:
+            return None
+
+        # the response hooks are called as the request is sent, such as the metrics of prometheus
+        hooks = merge_hooks(request_context.get("hooks"), self.session.hooks)
+        return dispatch_hook(HookEvent.RESPONSE, hooks, response)
+
+    def _cache_response(
+        self,
+        cache_key,  # type: str
+        response,  # type: Response
+    ):
+        if not 200 <= response.status_code < 300 or response.headers.get("X-Bkapi-Error-Code"):
+            return
+
+        self._response_cache.set(cache_key, response)  # type: ignore
+
     def _handle_exception(
         self,
         operation,  # type: Operation
@@ -282,19 +479,18 @@ class BaseClient(object):
     ):
         # type: (...) -> Optional[Response]
         # log exception
+        # the exception and CurlRequest are formatted lazily, only when the record is emitted
         if isinstance(exception, ResponseError):
-            logger.warning("%s\n%s", str(exception), CurlRequest(exception.request))
+            logger.warning("%s\n%s", exception, CurlRequest(exception.request))
         elif isinstance(exception, RequestException):
-            response = exception.response
-            response_headers_representer = ResponseHeadersRepresenter(
-                response.headers if response is not None else None
-            )
-            logger.exception(
-                "Request bkapi error, status_code: %s, %s\n%s",
-                response.status_code if response is not None else None,
-                response_headers_representer,
-                CurlRequest(exception.request),
-            )
+            if logger.isEnabledFor(logging.ERROR):
+                response = exception.response
+                logger.exception(
+                    "Request bkapi error, status_code: %s, %s\n%s",
+                    response.status_code if response is not None else None,
+                    ResponseHeadersRepresenter(response.headers if response is not None else None),
+                    CurlRequest(exception.request),
+                )
         else:
             logger.exception("request operation failed. operation: %s, context: %s", operation, context)
 
@@ -308,15 +504,15 @@ class BaseClient(object):
         response,  # type: Response
     ):
         # type: (...) -> Response
-        response_headers_representer = ResponseHeadersRepresenter(response.headers)
-        logger.debug(
-            "request to %s with context %s, status_code: %s, %s\n%s",
-            operation,
-            context,
-            response.status_code,
-            response_headers_representer,
-            CurlRequest(response.request),
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "request to %s with context %s, status_code: %s, %s\n%s",
+                operation,
+                context,
+                response.status_code,
+                ResponseHeadersRepresenter(response.headers),
+                CurlRequest(response.request),
+            )
 
         return response
 
@@ -328,6 +524,10 @@ class BaseClient(object):
         if response is None:
             return None
 
+        # the cached responses have been checked, return the content parsed before
+        if ResponseCache.has_content(response):
+            return ResponseCache.get_content(response)
+
         self.check_response_apigateway_error(response)
 
         try:
@@ -341,8 +541,8 @@ class BaseClient(object):
             )
 
         try:
-            return response.json()
-        except (TypeError, json.JSONDecodeError):
+            content = _parse_json(response)
+        except (TypeError, ValueError):
             response_headers_representer = ResponseHeadersRepresenter(response.headers)
             raise JSONResponseError(
                 "The response is not a valid JSON",
@@ -350,6 +550,9 @@ class BaseClient(object):
                 response_headers_representer=response_headers_representer,
             )
 
+        ResponseCache.set_content(response, content)
+        return content
+
     def close(self):
         """Close the session"""
         self.session.close()
@@ -8,11 +8,14 @@
  * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
  * specific language governing permissions and limitations under the License.
 """
+import os
 import string
-from typing import Any, Dict, List, Optional  # noqa
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union  # noqa
 
 from requests import Request  # noqa
 from requests import Session as RequestSession
+from requests.adapters import DEFAULT_POOLSIZE, BaseAdapter, HTTPAdapter
 from requests.hooks import dispatch_hook
 from requests.models import RequestHooksMixin
 from requests.sessions import merge_setting
@@ -76,6 +79,120 @@ def deregister_global_hook(event, hook):
         return False
 
 
+# the adapters shared by sessions, keyed by the pool and TLS settings,
+# so that the short-lived clients, which are created for each request, reuse the connections of the process
+_SHARED_ADAPTERS = {}  # type: Dict[Tuple[Any, ...], HTTPAdapter]
+_SHARED_ADAPTERS_LOCK = threading.Lock()
+
+
+def _get_shared_adapter(
+    pool_connections,  # type: int
+    pool_maxsize,  # type: int
+    verify,  # type: Union[bool, str]
+    cert,  # type: Union[None, str, Tuple[str, str]]
+):
+    # type: (...) -> HTTPAdapter
+    """Get the http adapter shared in the process, with the given pool and TLS settings."""
+    key = (pool_connections, pool_maxsize, verify, cert)
+    with _SHARED_ADAPTERS_LOCK:
+        adapter = _SHARED_ADAPTERS.get(key)
+        if adapter is None:
+            adapter = _SHARED_ADAPTERS[key] = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    return adapter
+
+
+class _SharedPoolAdapter(BaseAdapter):
+    """
+    _SharedPoolAdapter sends the requests by the http adapters shared in the process.
+
+    The requests before 2.32 key the connection pools by host only, and the connections opened are reused
+    regardless of the verify and cert settings, so the adapter is chosen by them when sending,
+    to avoid handing the unverified connections, or the ones with a client certificate, to the other sessions.
+    """
+
+    def __init__(
+        self,
+        pool_connections,  # type: int
+        pool_maxsize,  # type: int
+    ):
+        super(_SharedPoolAdapter, self).__init__()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+    def send(self, request, **kwargs):
+        # the arguments are passed by keywords, stream, timeout, verify, cert and proxies
+        cert = kwargs.get("cert")
+        if isinstance(cert, list):
+            cert = kwargs["cert"] = tuple(cert)
+
+        adapter = _get_shared_adapter(self.pool_connections, self.pool_maxsize, kwargs.get("verify", True), cert)
+        return adapter.send(request, **kwargs)
+
+    def close(self):
+        # the shared adapters are used by other sessions, release them by `close_shared_adapters`
+        pass
+
+
+def close_shared_adapters():
+    """Close the pooled connections of the shared adapters, they can still be used later."""
+    with _SHARED_ADAPTERS_LOCK:
+        for adapter in _SHARED_ADAPTERS.values():
+            adapter.close()
+
+
+def _reset_shared_adapters_after_fork():
+    # the connections created by the parent process should not be used by the child processes
+    global _SHARED_ADAPTERS_LOCK
+    _SHARED_ADAPTERS_LOCK = threading.Lock()
+    close_shared_adapters()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_adapters_after_fork)
+
+
+def ensure_pool_maxsize(session, maxsize):
+    # type: (RequestSession, int) -> None
+    """
+    Enlarge the connection pools of the default http adapters mounted on the session, if they are less than maxsize,
+    so that more connections can be kept alive and shared between threads.
+    The custom adapters will not be replaced, since they may be configured on purpose,
+    and the replaced adapters are closed, so that their pooled connections are released at once.
+    """
+    replaced_adapters = {}  # type: Dict[int, Tuple[HTTPAdapter, HTTPAdapter]]
+
+    for prefix in ("https://", "http://"):
+        adapter = session.adapters.get(prefix)
+        if isinstance(adapter, _SharedPoolAdapter):
+            # the shared adapters are chosen by the pool size, so just use the larger one
+            adapter.pool_maxsize = max(adapter.pool_maxsize, maxsize)
+            continue
+
+        if type(adapter) is not HTTPAdapter:
+            continue
+
+        pool_kw = adapter.poolmanager.connection_pool_kw
+        if pool_kw.get("maxsize", DEFAULT_POOLSIZE) >= maxsize:
+            continue
+
+        # the adapter may be mounted for multiple prefixes, replace it with the same one
+        if id(adapter) not in replaced_adapters:
+            enlarged_adapter = HTTPAdapter(
+                # the pool settings are kept by the adapter for pickling, fallback to the defaults if missing
+                pool_connections=getattr(adapter, "_pool_connections", DEFAULT_POOLSIZE),
+                pool_maxsize=maxsize,
+                max_retries=adapter.max_retries,
+                pool_block=pool_kw.get("block", False),
+            )
+            replaced_adapters[id(adapter)] = (adapter, enlarged_adapter)
+
+        session.mount(prefix, replaced_adapters[id(adapter)][1])
+
+    for adapter, _ in replaced_adapters.values():
+        adapter.close()
+
+
 class Session(RequestSession, RequestHooksMixin):
     """Session handle http requests, make a request and return the response
 
@@ -85,6 +202,12 @@ class Session(RequestSession, RequestHooksMixin):
     """
 
     default_user_agent = "bkapi-client/%s" % __version__
+    # the connections are kept alive by default, so the pool should be large enough to be shared between threads
+    pool_connections = 10
+    pool_maxsize = 100
+    # share the connection pool with other sessions in the process, it is not closed by `close`,
+    # set it to False to use a pool owned by the session
+    share_connection_pool = True
 
     def __init__(self, **kwargs):
         super(Session, self).__init__()
@@ -95,6 +218,21 @@ class Session(RequestSession, RequestHooksMixin):
         for k, v in kwargs.items():
             setattr(self, k, v)
 
+        if self.share_connection_pool:
+            adapter = _SharedPoolAdapter(self.pool_connections, self.pool_maxsize)  # type: BaseAdapter
+        else:
+            adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def close(self):
+        """Close the adapters of the session, the shared connection pool is kept for other sessions."""
+        # the adapter may be mounted for multiple prefixes, close it only once
+        adapters = {id(adapter): adapter for adapter in self.adapters.values()}
+        for adapter in adapters.values():
+            adapter.close()
+
     def handle(
         self,
         url,  # type: str
@@ -102,10 +240,26 @@ class Session(RequestSession, RequestHooksMixin):
         timeout=None,  # type: Optional[float]
         **kwargs,  # type: Any
     ):
-        render = _UrlRender(url, self.path_params)
-        rendered_url = render.render(path_params)
+        rendered_url = self.render_url(url, path_params)
         return self.request(url=rendered_url, timeout=timeout or self.timeout, **kwargs)
 
+    def render_url(
+        self,
+        url,  # type: str
+        path_params=None,  # type: Optional[Dict[str, Any]]
+    ):
+        # type: (...) -> str
+        """
+        Render the url with path_params, the common path_params of session will be used as defaults
+
+        :param url: url template
+        :type url: str
+        :param path_params: variables parts of the url path
+        :type path_params: Dict[str, Any]
+        """
+        render = _UrlRender(url, self.path_params)
+        return render.render(path_params)
+
     def set_user_agent(
         self,
         user_agent,  # type: str
@@ -137,9 +291,18 @@ class Session(RequestSession, RequestHooksMixin):
         self,
         request,  # type: Request
     ):
-        request = self.dispatch_hook(HookEvent.REQUEST, request)
+        if self.has_hooks(HookEvent.REQUEST):
+            request = self.dispatch_hook(HookEvent.REQUEST, request)
         return super(Session, self).prepare_request(request)
 
+    def has_hooks(
+        self,
+        event,  # type: str
+    ):
+        # type: (...) -> bool
+        """Whether there are any global or session hooks registered for the event"""
+        return bool(_SESSION_HOOKS.get(event) or self.hooks.get(event))
+
     def dispatch_hook(
         self,
         event,  # str
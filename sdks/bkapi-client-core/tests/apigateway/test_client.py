@@ -58,6 +58,13 @@ class TestAPIGatewayClient:
         client = APIGatewayClient(endpoint=endpoint, stage=stage)
         assert client._get_endpoint() == expected
 
+    def test_get_endpoint_stage_changed(self):
+        client = APIGatewayClient(endpoint="http://bkapi.example.com", stage="test")
+        assert client._get_endpoint() == "http://bkapi.example.com/test"
+
+        client._stage = "prod"
+        assert client._get_endpoint() == "http://bkapi.example.com/prod"
+
     @pytest.mark.parametrize(
         ("stage", "mappings", "expected"),
         [
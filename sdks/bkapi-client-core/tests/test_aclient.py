@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+ * TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-蓝鲸 PaaS 平台(BlueKing-PaaS) available.
+ * Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+ * Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at http://opensource.org/licenses/MIT
+ * Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+ * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+ * specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import json
+import socket
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+from requests.exceptions import ConnectionError, RequestException  # noqa: E402
+
+from bkapi_client_core.aclient import AsyncBaseClient, _build_timeout, _get_ssl_context  # noqa: E402
+from bkapi_client_core.base import Operation, OperationGroup  # noqa: E402
+from bkapi_client_core.config import HookEvent  # noqa: E402
+from bkapi_client_core.exceptions import APIGatewayResponseError, HTTPResponseError  # noqa: E402
+from bkapi_client_core.property import bind_property  # noqa: E402
+
+
+async def echo(request):
+    body = await request.read()
+    return web.json_response(
+        {
+            "method": request.method,
+            "path": request.path,
+            "query": dict(request.query),
+            "json": json.loads(body) if body else None,
+            "authorization": request.headers.get("X-Bkapi-Authorization"),
+        }
+    )
+
+
+async def apigateway_error(request):
+    return web.json_response({}, status=403, headers={"X-Bkapi-Error-Code": "forbidden"})
+
+
+async def server_error(request):
+    return web.Response(status=500)
+
+
+class Group(OperationGroup):
+    echo = bind_property(Operation, method="GET", path="/echo/{color}/", name="echo")
+    create = bind_property(Operation, method="POST", path="/echo/", name="create")
+    apigateway_error = bind_property(Operation, method="GET", path="/apigateway-error/", name="apigateway_error")
+    server_error = bind_property(Operation, method="GET", path="/server-error/", name="server_error")
+
+
+class Client(AsyncBaseClient):
+    api = bind_property(Group, name="api")
+
+
+def run_with_server(func):
+    async def main():
+        app = web.Application()
+        app.router.add_route("*", "/echo/{color}/", echo)
+        app.router.add_route("*", "/echo/", echo)
+        app.router.add_get("/apigateway-error/", apigateway_error)
+        app.router.add_get("/server-error/", server_error)
+
+        async with TestServer(app) as server, Client(str(server.make_url(""))) as client:
+            return await func(client)
+
+    return asyncio.run(main())
+
+
+class TestAsyncBaseClient:
+    def test_acall(self):
+        async def func(client):
+            client.update_bkapi_authorization(bk_app_code="test")
+            return await client.acall(client.api.echo, data={"x": "1"}, path_params={"color": "red"})
+
+        result = run_with_server(func)
+        assert result["method"] == "GET"
+        assert result["path"] == "/echo/red/"
+        assert result["query"] == {"x": "1"}
+        assert json.loads(result["authorization"]) == {"bk_app_code": "test"}
+
+    def test_acall_json(self):
+        async def func(client):
+            return await client.acall(client.api.create, data={"x": 1}, params={"y": "2"})
+
+        result = run_with_server(func)
+        assert result["method"] == "POST"
+        assert result["query"] == {"y": "2"}
+        assert result["json"] == {"x": 1}
+
+    def test_acall_concurrently(self):
+        async def func(client):
+            return await asyncio.gather(
+                *[client.acall(client.api.echo, path_params={"color": str(i)}) for i in range(5)]
+            )
+
+        results = run_with_server(func)
+        assert [r["path"] for r in results] == ["/echo/%s/" % i for i in range(5)]
+
+    def test_arequest(self):
+        async def func(client):
+            return await client.arequest(client.api.echo, path_params={"color": "red"})
+
+        response = run_with_server(func)
+        assert response.status_code == 200
+        assert response.json()["path"] == "/echo/red/"
+        assert response.request.method == "GET"
+
+    def test_arequest_session_arguments(self):
+        async def func(client):
+            return await client.arequest(client.api.echo, path_params={"color": "red"}, stream=True, cert=None)
+
+        response = run_with_server(func)
+        assert response.status_code == 200
+
+    def test_response_cache(self):
+        calls = []
+
+        async def cached(request):
+            calls.append(request)
+            return web.json_response({"count": len(calls)}, headers={"Cache-Control": "max-age=60"})
+
+        async def main():
+            app = web.Application()
+            app.router.add_get("/echo/{color}/", cached)
+
+            async with TestServer(app) as server, Client(str(server.make_url(""))) as client:
+                client.enable_response_cache()
+                return [await client.acall(client.api.echo, path_params={"color": "red"}) for _ in range(2)]
+
+        assert asyncio.run(main()) == [{"count": 1}, {"count": 1}]
+        assert len(calls) == 1
+
+    def test_successive_event_loops(self):
+        async def main(client, closing):
+            app = web.Application()
+            app.router.add_get("/echo/{color}/", echo)
+
+            async with TestServer(app) as server:
+                client._endpoint = str(server.make_url(""))
+                result = await client.acall(client.api.echo, path_params={"color": "red"})
+
+            session = client._aiohttp_session
+            if closing:
+                await client.aclose()
+            return result, session
+
+        client = Client()
+
+        # the aiohttp session bound to the closed loop is closed and replaced
+        result, first_session = asyncio.run(main(client, False))
+        assert result["path"] == "/echo/red/"
+        assert not first_session.closed
+
+        result, second_session = asyncio.run(main(client, True))
+        assert result["path"] == "/echo/red/"
+        assert first_session.closed
+        assert second_session is not first_session
+        assert second_session.closed
+
+    def test_running_event_loops(self):
+        client = Client("http://example.com")
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(client._get_aiohttp_session())
+
+            # the session of another loop, which is not closed, can not be replaced
+            with pytest.raises(RuntimeError, match="another running event loop"):
+                asyncio.run(client._get_aiohttp_session())
+
+            loop.run_until_complete(client.aclose())
+        finally:
+            loop.close()
+
+    def test_response_hook(self, mocker):
+        hook = mocker.MagicMock(side_effect=lambda response, **kwargs: response)
+
+        async def func(client):
+            client.session.register_hook(HookEvent.RESPONSE, hook)
+            return await client.arequest(client.api.echo, path_params={"color": "red"})
+
+        response = run_with_server(func)
+        hook.assert_called_once()
+        assert hook.call_args[0][0] is response
+
+    @pytest.mark.parametrize(
+        ("operation_name", "expected_error"),
+        [
+            ("apigateway_error", APIGatewayResponseError),
+            ("server_error", HTTPResponseError),
+        ],
+    )
+    def test_acall_error(self, operation_name, expected_error):
+        async def func(client):
+            return await client.acall(getattr(client.api, operation_name))
+
+        with pytest.raises(expected_error):
+            run_with_server(func)
+
+    def test_connection_error(self, mocker, unused_tcp_port):
+        error_hook = mocker.MagicMock()
+
+        async def main():
+            async with Client("http://127.0.0.1:%s" % unused_tcp_port) as client:
+                client.session.register_hook(HookEvent.OPERATION_ERROR, error_hook)
+                return await client.arequest(client.api.echo, path_params={"color": "red"})
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(main())
+
+        assert isinstance(error_hook.call_args[0][0], RequestException)
+
+    def test_aclose(self, mocker):
+        async def main():
+            client = Client("http://example.com")
+            session = await client._get_aiohttp_session()
+            mock_close = mocker.patch.object(client, "close")
+
+            await client.aclose()
+            return client, session, mock_close
+
+        client, session, mock_close = asyncio.run(main())
+        assert session.closed
+        assert client._aiohttp_session is None
+        mock_close.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    ("timeout", "expected"),
+    [
+        (None, aiohttp.ClientTimeout(total=None)),
+        (1.0, aiohttp.ClientTimeout(total=1.0)),
+        ((1.0, 2.0), aiohttp.ClientTimeout(sock_connect=1.0, sock_read=2.0)),
+    ],
+)
+def test_build_timeout(timeout, expected):
+    assert _build_timeout(timeout) == expected
+
+
+@pytest.mark.parametrize("verify", [True, False])
+def test_get_ssl_context_default(verify):
+    assert _get_ssl_context(verify, None) is verify
+
+
+def test_get_ssl_context(mocker):
+    _get_ssl_context.cache_clear()
+    mock_create = mocker.patch("ssl.create_default_context")
+
+    context = _get_ssl_context(False, ("cert.pem", "key.pem"))
+    assert _get_ssl_context(False, ("cert.pem", "key.pem")) is context
+    mock_create.assert_called_once_with()
+    context.load_cert_chain.assert_called_once_with("cert.pem", "key.pem")
+    assert context.check_hostname is False
+
+    _get_ssl_context("ca.pem", None)
+    mock_create.assert_called_with(cafile="ca.pem")
+    _get_ssl_context.cache_clear()
+
+
+@pytest.fixture
+def unused_tcp_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
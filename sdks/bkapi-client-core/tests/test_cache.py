@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+ * TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-蓝鲸 PaaS 平台(BlueKing-PaaS) available.
+ * Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+ * Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at http://opensource.org/licenses/MIT
+ * Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+ * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+ * specific language governing permissions and limitations under the License.
+"""
+import time
+from email.utils import formatdate
+
+import pytest
+from requests import Response
+
+from bkapi_client_core.cache import ResponseCache, get_cache_ttl
+
+
+def make_response(headers):
+    response = Response()
+    response.status_code = 200
+    response.headers.update(headers)
+    return response
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        (None, None),
+        ({}, None),
+        ({"Cache-Control": "max-age=60"}, 60),
+        ({"Cache-Control": "public, max-age=60"}, 60),
+        ({"Cache-Control": 'max-age="60"'}, 60),
+        ({"Cache-Control": "s-maxage=60"}, None),
+        ({"Cache-Control": "no-cache, max-age=60"}, None),
+        ({"Cache-Control": "no-store"}, None),
+        ({"Cache-Control": "max-age=60", "Expires": formatdate(time.time() + 3600, usegmt=True)}, 60),
+        ({"Expires": "invalid"}, None),
+        ({"Expires": formatdate(time.time() - 3600, usegmt=True)}, -3600),
+    ],
+)
+def test_get_cache_ttl(headers, expected):
+    ttl = get_cache_ttl(headers)
+    if expected is None:
+        assert ttl is None
+    else:
+        assert ttl == pytest.approx(expected, abs=2)
+
+
+def test_get_cache_ttl_expires():
+    ttl = get_cache_ttl({"Expires": formatdate(time.time() + 3600, usegmt=True)})
+    assert ttl == pytest.approx(3600, abs=2)
+
+
+class TestResponseCache:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.cache = ResponseCache(maxsize=2)
+
+    def test_get_set(self):
+        response = make_response({"Cache-Control": "max-age=60"})
+
+        assert self.cache.get("key") is None
+        assert self.cache.set("key", response) is True
+        assert self.cache.get("key") is response
+
+    def test_set_not_cacheable(self):
+        assert self.cache.set("key", make_response({})) is False
+        assert self.cache.set("key", make_response({"Cache-Control": "max-age=0"})) is False
+        assert len(self.cache) == 0
+
+    def test_expired(self, mocker):
+        self.cache.set("key", make_response({"Cache-Control": "max-age=60"}))
+
+        mocker.patch("bkapi_client_core.cache.time.monotonic", return_value=time.monotonic() + 61)
+        assert self.cache.get("key") is None
+        assert len(self.cache) == 0
+
+    def test_lru(self):
+        for key in ["a", "b"]:
+            self.cache.set(key, make_response({"Cache-Control": "max-age=60"}))
+
+        # a is used recently, so b will be evicted
+        assert self.cache.get("a") is not None
+        self.cache.set("c", make_response({"Cache-Control": "max-age=60"}))
+
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") is not None
+        assert self.cache.get("c") is not None
+
+    def test_clear(self):
+        self.cache.set("key", make_response({"Cache-Control": "max-age=60"}))
+        self.cache.clear()
+        assert self.cache.get("key") is None
+
+    def test_content(self):
+        response = make_response({"Cache-Control": "max-age=60"})
+
+        # the content is kept only if the response is cached
+        ResponseCache.set_content(response, {"foo": "bar"})
+        assert ResponseCache.has_content(response) is False
+
+        self.cache.set("key", response)
+        ResponseCache.set_content(response, {"foo": "bar"})
+        assert ResponseCache.has_content(response) is True
+        assert ResponseCache.get_content(response) == {"foo": "bar"}
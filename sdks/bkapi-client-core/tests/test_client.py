@@ -8,11 +8,22 @@
  * an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
  * specific language governing permissions and limitations under the License.
 """
+import json
+
 import pytest
+from requests import Response
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
 
 from bkapi_client_core.base import Operation, OperationGroup
-from bkapi_client_core.client import BaseClient, RequestContextBuilder, ResponseHeadersRepresenter
+from bkapi_client_core.client import (
+    BaseClient,
+    RequestContextBuilder,
+    ResponseHeadersRepresenter,
+    _cached_urljoin,
+    _parse_json,
+)
 from bkapi_client_core.config import HookEvent
 from bkapi_client_core.exceptions import APIGatewayResponseError, EndpointNotSetError, ResponseError
 from bkapi_client_core.property import bind_property
@@ -39,6 +50,15 @@ class TestRequestContextBuilder:
         self.builder.build_url(context, endpoint, path)
         assert context["url"] == excepted
 
+    def test_build_url_cached(self):
+        self.builder.build_url({}, "http://example.com", "/api/cached/")
+        hits = _cached_urljoin.cache_info().hits
+
+        context = {}
+        self.builder.build_url(context, "http://example.com", "/api/cached/")
+        assert context["url"] == "http://example.com/api/cached/"
+        assert _cached_urljoin.cache_info().hits == hits + 1
+
     @pytest.mark.parametrize(
         ("method", "params", "data", "excepted_params", "excepted_json"),
         [
@@ -149,6 +169,14 @@ class TestRequestContextBuilder:
         assert context.get("params") == excepted_params
         assert context.get("json") == excepted_json
 
+    def test_build_data_not_modified(self):
+        data = {"x": 1}
+        context = {"params": {"y": 2}, "method": "GET"}
+        self.builder.build_data(context, data)
+
+        assert context["params"] == {"x": 1, "y": 2}
+        assert data == {"x": 1}
+
     @pytest.mark.parametrize(
         ("input", "output"),
         [
@@ -202,6 +230,31 @@ class TestResponseHeadersRepresenter:
         headers = ResponseHeadersRepresenter({"X-Bkapi-Request-Id": "abcdef"})
         assert headers.request_id == "abcdef"
 
+    @pytest.mark.parametrize("headers_class", [dict, CaseInsensitiveDict])
+    def test_headers_class(self, headers_class):
+        headers = ResponseHeadersRepresenter(
+            headers_class(
+                {
+                    "X-Bkapi-Request-Id": "abcdef",
+                    "X-Bkapi-Error-Code": "foo",
+                    "X-Bkapi-Error-Message": "error",
+                }
+            )
+        )
+        assert headers.request_id == "abcdef"
+        assert headers.error_code == "foo"
+        assert headers.error_message == "error"
+
+    def test_case_insensitive_headers(self):
+        headers = ResponseHeadersRepresenter(CaseInsensitiveDict({"x-bkapi-request-id": "abcdef"}))
+        assert headers.request_id == "abcdef"
+        assert headers.error_code == ""
+        assert headers.error_message == ""
+
+    def test_slots(self):
+        headers = ResponseHeadersRepresenter({})
+        assert not hasattr(headers, "__dict__")
+
     @pytest.mark.parametrize(
         ("headers", "expected"),
         [
@@ -237,6 +290,14 @@ class TestResponseHeadersRepresenter:
                 },
                 "request_id: abcdef",
             ),
+            (
+                {
+                    "X-Bkapi-Request-Id": "abcdef",
+                    "X-Bkapi-Error-Message": "error",
+                },
+                "request_id: abcdef, error",
+            ),
+            (None, ""),
         ],
     )
     def test_str(self, headers, expected):
@@ -258,6 +319,14 @@ class TestBaseClient:
         client = BaseClient(name=name)
         assert client.name == name
 
+    @pytest.mark.parametrize("closing", [True, False])
+    def test_share_connection_pool(self, closing):
+        class Client(BaseClient):
+            close_after_request = closing
+
+        assert Client().session.share_connection_pool is not closing
+        assert BaseClient(session=Session()).session.share_connection_pool is True
+
     def test_reuse_session_connection(self, mocker, faker, requests_mock):
         url = faker.url()
         requests_mock.get(url, json={"result": True})
@@ -265,6 +334,30 @@ class TestBaseClient:
         client = BaseClient(url)
         mock_close = mocker.patch.object(client, "close", return_value=None)
 
+        # handle_request without `with`, will not close by default
+        client.handle_request(url, {"method": "GET"})
+        mock_close.assert_not_called()
+
+        # handle_request in `with`, will close when exiting
+        with client:
+            assert client._reuse_session_connection is True
+
+            client.handle_request(url, {"method": "GET"})
+            mock_close.assert_not_called()
+
+        assert client._reuse_session_connection is True
+        mock_close.assert_called_once_with()
+
+    def test_close_after_request(self, mocker, faker, requests_mock):
+        url = faker.url()
+        requests_mock.get(url, json={"result": True})
+
+        class Client(BaseClient):
+            close_after_request = True
+
+        client = Client(url)
+        mock_close = mocker.patch.object(client, "close", return_value=None)
+
         # handle_request without `with`, will close
         client.handle_request(url, {"method": "GET"})
         mock_close.assert_called_once_with()
@@ -283,6 +376,53 @@ class TestBaseClient:
         assert client._reuse_session_connection is False
         mock_close.assert_called_once_with()
 
+    def test_close_after_request_error(self, mocker, faker, requests_mock):
+        url = faker.url()
+        requests_mock.get(url, exc=RequestException)
+
+        class Client(BaseClient):
+            close_after_request = True
+
+        client = Client(url)
+        mock_close = mocker.patch.object(client, "close", return_value=None)
+
+        with pytest.raises(RequestException):
+            client.handle_request(url, {"method": "GET"})
+
+        mock_close.assert_called_once_with()
+
+    @pytest.mark.parametrize("closing", [True, False])
+    def test_handle_request_many(self, mocker, requests_mock, closing):
+        class Client(BaseClient):
+            close_after_request = closing
+
+        client = Client("http://example.com")
+        mock_close = mocker.patch.object(client, "close", return_value=None)
+
+        for i in range(5):
+            requests_mock.get("http://example.com/%s/" % i, json={"index": i})
+        requests_mock.get("http://example.com/error/", status_code=500)
+
+        operations_and_contexts = [(str(i), {"method": "GET", "path": "/%s/" % i}) for i in range(5)]
+        operations_and_contexts.append(("error", {"method": "GET", "path": "/error/"}))
+
+        results = {}
+        for operation, _, future in client.handle_request_many(operations_and_contexts, max_workers=3):
+            # the client state is not changed by the batch
+            assert client._reuse_session_connection is not closing
+            mock_close.assert_not_called()
+            response = future.result()
+            if operation == "error":
+                with pytest.raises(ResponseError):
+                    client.parse_response(operation, response)
+            else:
+                results[operation] = client.parse_response(operation, response)
+
+        assert results == {str(i): {"index": i} for i in range(5)}
+        # the requests in batch do not close the session, but close it after the batch if required
+        assert client._reuse_session_connection is not closing
+        assert mock_close.called is closing
+
     @pytest.mark.parametrize(
         ("endpoint", "operation_path", "excepted_url"),
         [
@@ -346,6 +486,17 @@ class TestBaseClient:
         client.handle_request(operation, context)
         session.handle.assert_called_once_with(url="http://example.com/hooked")
 
+    def test_handle_request_without_hooks(self, mocker):
+        session = Session()
+        mocker.patch.object(session, "handle")
+        mock_dispatch_hook = mocker.patch.object(session, "dispatch_hook")
+
+        client = BaseClient(endpoint="http://example.com", session=session)
+        client.handle_request(mocker.MagicMock(), {"path": "test"})
+
+        mock_dispatch_hook.assert_not_called()
+        session.handle.assert_called_once_with(url="http://example.com/test")
+
     def test_handle_error(self, mocker, faker):
         session = mocker.MagicMock()
         client = BaseClient(session=session, endpoint=faker.url())
@@ -394,13 +545,20 @@ class TestBaseClient:
         ],
     )
     def test_check_response_apigateway_error(self, mocker, response, expected_error):
+        mock_representer = mocker.patch(
+            "bkapi_client_core.client.ResponseHeadersRepresenter", wraps=ResponseHeadersRepresenter
+        )
+
         if not expected_error:
             self.client.check_response_apigateway_error(response and mocker.MagicMock(**response))
+            mock_representer.assert_not_called()
             return
 
-        with pytest.raises(expected_error):
+        with pytest.raises(expected_error) as err:
             self.client.check_response_apigateway_error(mocker.MagicMock(**response))
 
+        assert err.value.error_code == "error"
+
     @pytest.mark.parametrize(
         ("session_headers", "headers", "expected"),
         [
@@ -428,6 +586,105 @@ class TestBaseClient:
         client.update_headers(headers)
         assert client.session.headers == expected
 
+    @pytest.mark.parametrize(
+        ("headers", "expected"),
+        [
+            ({"x-color": "red"}, {"x-token": "test", "x-color": "red"}),
+            ({"X-Token": "red"}, {"X-Token": "red"}),
+            ({"x-token": None, "x-color": "red"}, {"x-color": "red"}),
+            ({"x-size": None}, {"x-token": "test"}),
+            (None, {"x-token": "test"}),
+            ({}, {"x-token": "test"}),
+        ],
+    )
+    def test_update_headers_in_place(self, faker, headers, expected):
+        client = BaseClient(endpoint=faker.url())
+        session_headers = client.session.headers = CaseInsensitiveDict({"x-token": "test"})
+
+        client.update_headers(headers)
+        assert client.session.headers is session_headers
+        assert client.session.headers == CaseInsensitiveDict(expected)
+
+    def test_response_cache(self, requests_mock):
+        class Group(OperationGroup):
+            get = bind_property(Operation, method="GET", path="/get/", name="get")
+            post = bind_property(Operation, method="POST", path="/post/", name="post")
+
+        class Client(BaseClient):
+            api = bind_property(Group, name="api")
+
+        client = Client("http://example.com")
+        client.enable_response_cache()
+
+        headers = {"Cache-Control": "max-age=60"}
+        requests_mock.get("http://example.com/get/", json={"foo": "bar"}, headers=headers)
+        requests_mock.post("http://example.com/post/", json={"foo": "bar"}, headers=headers)
+
+        result = client.api.get({"x": 1})
+        assert result == {"foo": "bar"}
+        # the content parsed before is returned
+        assert client.api.get({"x": 1}) is result
+        assert requests_mock.call_count == 1
+
+        # the requests with different params, authorization or methods are not hit
+        client.api.get({"x": 2})
+        client.update_bkapi_authorization(bk_app_code="test")
+        client.api.get({"x": 1})
+        client.api.post({"x": 1})
+        client.api.post({"x": 1})
+        assert requests_mock.call_count == 5
+
+        client.disable_response_cache()
+        client.api.get({"x": 1})
+        assert requests_mock.call_count == 6
+
+    def test_response_cache_hooks(self, mocker, requests_mock):
+        url = "http://example.com/get/"
+        requests_mock.get(url, json={"foo": "bar"}, headers={"Cache-Control": "max-age=60"})
+
+        client = BaseClient("http://example.com")
+        client.enable_response_cache()
+
+        # the hooks of each request are called, even if the response is cached
+        for _ in range(2):
+            hook = mocker.MagicMock(side_effect=lambda response, **kwargs: response)
+            client.handle_request(None, {"method": "GET", "path": "/get/", "hooks": {"response": [hook]}})
+            hook.assert_called_once()
+
+        assert requests_mock.call_count == 1
+
+    def test_response_cache_unsortable_params(self, requests_mock):
+        url = "http://example.com/get/"
+        requests_mock.get(url, json={"foo": "bar"}, headers={"Cache-Control": "max-age=60"})
+
+        client = BaseClient("http://example.com")
+        client.enable_response_cache()
+
+        for _ in range(2):
+            response = client.handle_request(None, {"method": "GET", "path": "/get/", "params": {1: "a", "b": 2}})
+            assert response.status_code == 200
+
+        assert requests_mock.call_count == 2
+
+    @pytest.mark.parametrize(
+        ("status_code", "headers"),
+        [
+            (200, {"Cache-Control": "no-cache"}),
+            (200, {"Cache-Control": "max-age=60", "X-Bkapi-Error-Code": "error"}),
+            (500, {"Cache-Control": "max-age=60"}),
+        ],
+    )
+    def test_response_cache_not_cacheable(self, requests_mock, status_code, headers):
+        url = "http://example.com/get/"
+        requests_mock.get(url, json={"foo": "bar"}, headers=headers, status_code=status_code)
+
+        client = BaseClient("http://example.com")
+        client.enable_response_cache()
+
+        client.handle_request(None, {"method": "GET", "path": "/get/"})
+        client.handle_request(None, {"method": "GET", "path": "/get/"})
+        assert requests_mock.call_count == 2
+
     @pytest.mark.parametrize(
         ("auth", "update_auth", "expected"),
         [
@@ -474,6 +731,28 @@ class TestBaseClient:
                 RequestException(response=None),
             )
 
+    def test_handler_exception_logging_disabled(self, mocker):
+        mocker.patch("bkapi_client_core.client.logger.isEnabledFor", return_value=False)
+        mock_representer = mocker.patch("bkapi_client_core.client.ResponseHeadersRepresenter")
+
+        with pytest.raises(RequestException):  # type: ignore
+            self.client._handle_exception(
+                mocker.MagicMock(),
+                mocker.MagicMock(),
+                RequestException(response=mocker.MagicMock()),
+            )
+
+        mock_representer.assert_not_called()
+
+    @pytest.mark.parametrize("debug_enabled", [True, False])
+    def test_handle_response(self, mocker, debug_enabled):
+        mocker.patch("bkapi_client_core.client.logger.isEnabledFor", return_value=debug_enabled)
+        mock_curl_request = mocker.patch("bkapi_client_core.client.CurlRequest")
+        response = mocker.MagicMock(headers={"X-Bkapi-Request-Id": "abcd"})
+
+        assert self.client._handle_response(mocker.MagicMock(), {}, response) is response
+        assert mock_curl_request.called is debug_enabled
+
     def test_handle_response_content(self, mocker):
         assert self.client._handle_response_content(mocker.MagicMock(), None) is None
 
@@ -499,3 +778,59 @@ class TestBaseClient:
                 mocker.MagicMock(),
                 response and mocker.MagicMock(**response),
             )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-16"])
+def test_parse_json(mocker, use_orjson, encoding):
+    if not use_orjson:
+        mocker.patch("bkapi_client_core.client.orjson", None)
+
+    response = Response()
+    response._content = json.dumps({"foo": "蓝鲸"}, ensure_ascii=False).encode(encoding)
+
+    assert _parse_json(response) == {"foo": "蓝鲸"}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_parse_json_error(mocker, use_orjson):
+    if not use_orjson:
+        mocker.patch("bkapi_client_core.client.orjson", None)
+
+    response = Response()
+    response._content = b"not json"
+
+    with pytest.raises(ValueError, match="Expecting value"):
+        _parse_json(response)
+
+
+def test_share_connection_pool_by_verify(mocker, monkeypatch):
+    # the CA bundle of the environment overrides the verify of session
+    monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+    monkeypatch.delenv("CURL_CA_BUNDLE", raising=False)
+
+    def send(adapter, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response._content = b"{}"
+        return response
+
+    mock_send = mocker.patch.object(HTTPAdapter, "send", autospec=True, side_effect=send)
+
+    verified_client = BaseClient("https://example.com")
+    unverified_client = BaseClient("https://example.com")
+    unverified_client.disable_ssl_verify()
+
+    verified_client.handle_request(None, {"method": "GET", "path": "/get/"})
+    unverified_client.handle_request(None, {"method": "GET", "path": "/get/"})
+    verified_client.handle_request(None, {"method": "GET", "path": "/get/"})
+
+    (verified_adapter, _), verified_kwargs = mock_send.call_args_list[0]
+    (unverified_adapter, _), unverified_kwargs = mock_send.call_args_list[1]
+    assert verified_kwargs["verify"] is True
+    assert unverified_kwargs["verify"] is False
+    # the unverified connections are not reused by the other clients
+    assert verified_adapter is not unverified_adapter
+    assert mock_send.call_args_list[2][0][0] is verified_adapter
@@ -9,10 +9,18 @@
  * specific language governing permissions and limitations under the License.
 """
 import pytest
+import requests
+from requests.adapters import HTTPAdapter
 
 from bkapi_client_core.config import HookEvent
 from bkapi_client_core.exceptions import PathParamsMissing
-from bkapi_client_core.session import Session, deregister_global_hook, register_global_hook
+from bkapi_client_core.session import (
+    Session,
+    close_shared_adapters,
+    deregister_global_hook,
+    ensure_pool_maxsize,
+    register_global_hook,
+)
 
 
 class TestSession:
@@ -41,6 +49,71 @@ class TestSession:
         result = session.handle(url, method="GET", path_params=path_params)
         assert result.json() == {"a": "b"}
 
+    def test_render_url(self):
+        session = Session(path_params={"color": "green", "size": "large"})
+        assert session.render_url("http://example.com/{color}/{size}/", {"color": "red"}) == (
+            "http://example.com/red/large/"
+        )
+
+    def test_pooled_adapter(self):
+        session = Session(pool_maxsize=20)
+        adapter = session.get_adapter("https://example.com")
+        assert adapter is session.get_adapter("http://example.com")
+        assert adapter.pool_maxsize == 20
+        assert adapter.pool_connections == Session.pool_connections
+
+    @pytest.fixture
+    def get_shared_adapter(self, mocker):
+        mock_send = mocker.patch.object(HTTPAdapter, "send", autospec=True)
+
+        def get_shared_adapter(session, **kwargs):
+            session.get_adapter("https://example.com").send(mocker.MagicMock(), **kwargs)
+            return mock_send.call_args[0][0]
+
+        return get_shared_adapter
+
+    def test_shared_adapter(self, mocker, get_shared_adapter):
+        session = Session()
+        adapter = get_shared_adapter(session)
+        assert get_shared_adapter(Session()) is adapter
+
+        mock_close = mocker.patch.object(adapter, "close")
+        session.close()
+        mock_close.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"verify": False},
+            {"verify": "/path/to/ca.pem"},
+            {"cert": "/path/to/cert.pem"},
+            {"cert": ["/path/to/cert.pem", "/path/to/key.pem"]},
+        ],
+    )
+    def test_shared_adapter_tls_settings(self, get_shared_adapter, kwargs):
+        session = Session()
+        adapter = get_shared_adapter(session)
+
+        # the connections are not shared between the requests with different TLS settings
+        assert get_shared_adapter(session, **kwargs) is not adapter
+        assert get_shared_adapter(Session(), **kwargs) is get_shared_adapter(session, **kwargs)
+
+    def test_owned_adapter(self, mocker):
+        session = Session(share_connection_pool=False)
+        adapter = session.get_adapter("https://example.com")
+        assert isinstance(adapter, HTTPAdapter)
+
+        mock_close = mocker.patch.object(adapter, "close")
+        session.close()
+        mock_close.assert_called_once_with()
+
+    def test_close_shared_adapters(self, mocker, get_shared_adapter):
+        adapter = get_shared_adapter(Session())
+        mock_close = mocker.patch.object(adapter, "close")
+
+        close_shared_adapters()
+        mock_close.assert_called_once_with()
+
     def test_path_params_missing(self):
         session = Session()
 
@@ -64,6 +137,23 @@ class TestSession:
         with pytest.raises(RuntimeError):  # type: ignore
             self.session.handle("http://example.com/echo/", method="GET")
 
+    def test_has_hooks(self, mocker):
+        hook = mocker.MagicMock()
+        session = Session()
+        assert session.has_hooks("test") is False
+
+        session.register_hook("test", hook)
+        assert session.has_hooks("test") is True
+
+        session.deregister_hook("test", hook)
+        assert session.has_hooks("test") is False
+
+        register_global_hook("test", hook)
+        assert session.has_hooks("test") is True
+
+        deregister_global_hook("test", hook)
+        assert session.has_hooks("test") is False
+
     def test_hook(self, mocker):
         hook = mocker.MagicMock()
 
@@ -115,3 +205,57 @@ class TestSession:
         assert response.request.headers["X-Testing"] == "1"
 
         assert deregister_global_hook(HookEvent.REQUEST, hook)
+
+
+class TestEnsurePoolMaxsize:
+    def get_pool_maxsize(self, session, prefix):
+        return session.adapters[prefix].poolmanager.connection_pool_kw["maxsize"]
+
+    def test_default_session(self):
+        session = requests.Session()
+        session.adapters["https://"].max_retries.total = 3
+
+        ensure_pool_maxsize(session, 50)
+        assert self.get_pool_maxsize(session, "https://") == 50
+        assert self.get_pool_maxsize(session, "http://") == 50
+        assert session.adapters["https://"].max_retries.total == 3
+
+    def test_close_replaced_adapter(self, mocker):
+        session = requests.Session()
+        adapter = session.adapters["https://"]
+        mock_close = mocker.patch.object(adapter, "close")
+
+        ensure_pool_maxsize(session, 50)
+        assert session.adapters["https://"] is not adapter
+        mock_close.assert_called_once_with()
+
+    def test_shared_adapter(self):
+        session = Session(pool_maxsize=5)
+        adapter = session.adapters["https://"]
+
+        ensure_pool_maxsize(session, 50)
+        assert session.adapters["https://"] is adapter
+        assert session.adapters["http://"] is adapter
+        assert adapter.pool_maxsize == 50
+
+        ensure_pool_maxsize(session, 20)
+        assert adapter.pool_maxsize == 50
+
+    def test_large_enough(self):
+        session = Session()
+        adapter = session.adapters["https://"]
+
+        ensure_pool_maxsize(session, 50)
+        assert session.adapters["https://"] is adapter
+
+    def test_custom_adapter(self):
+        class CustomAdapter(HTTPAdapter):
+            pass
+
+        session = requests.Session()
+        adapter = CustomAdapter()
+        session.mount("https://", adapter)
+
+        ensure_pool_maxsize(session, 50)
+        assert session.adapters["https://"] is adapter
+        assert self.get_pool_maxsize(session, "http://") == 50